@@ -3,12 +3,43 @@
 
 import asyncio
 import os
-from typing import Optional
+import threading
 from dotenv import load_dotenv
 
 from src.agent_prototype.agent.claude_agent import ClaudeAgent, AgentConfig
 
 
+async def read_input(prompt: str) -> str:
+    """Read a line of user input without blocking the event loop.
+    
+    The blocking input() call runs in a daemon thread so a pending read
+    never keeps the process alive after the session is cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def resolve(result=None, error=None):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def read():
+        try:
+            outcome = (input(prompt), None)
+        except BaseException as e:
+            outcome = (None, e)
+        try:
+            loop.call_soon_threadsafe(resolve, *outcome)
+        except RuntimeError:
+            pass  # Event loop already closed
+    
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+
 async def run_interactive_session(agent: ClaudeAgent):
     """Run an interactive chat session with the agent."""
     print("\n🤖 Claude Agent with MCP Tools")
@@ -28,7 +59,7 @@ async def run_interactive_session(agent: ClaudeAgent):
     
     while True:
         try:
-            user_input = input("\nYou: ").strip()
+            user_input = (await read_input("\nYou: ")).strip()
             
             if user_input.lower() in ['quit', 'exit']:
                 print("👋 Goodbye!")
@@ -47,8 +78,8 @@ async def run_interactive_session(agent: ClaudeAgent):
                 continue
             
             print("\nAgent: ", end="", flush=True)
-            response = await agent.chat(user_input)
-            print(response)
+            await agent.chat(user_input, on_text=lambda text: print(text, end="", flush=True))
+            print()
             
         except KeyboardInterrupt:
             print("\n\n👋 Session ended by user")
@@ -76,14 +107,13 @@ async def run_demo_mode(agent: ClaudeAgent):
         "Explain what MCP (Model Context Protocol) is in simple terms."
     ]
     
-    for i, query in enumerate(demo_queries, 1):
+    # The queries are independent, so ask them all concurrently
+    responses = await asyncio.gather(*(agent.chat_once(query) for query in demo_queries))
+    
+    for i, (query, response) in enumerate(zip(demo_queries, responses), 1):
         print(f"\n📝 Demo Query {i}: {query}")
         print("-" * 50)
-        
-        response = await agent.chat(query)
         print(f"🤖 Response: {response}")
-        
-        await asyncio.sleep(1)  # Brief pause between queries
 
 
 async def main():
@@ -111,22 +141,32 @@ async def main():
     print(f"   Max tokens: {config.max_tokens}")
     print(f"   Temperature: {config.temperature}")
     
-    try:
+    # The context manager disconnects from the MCP server on exit
+    async with agent:
         # Check command line arguments
         import sys
         if len(sys.argv) > 1 and sys.argv[1] == "--demo":
             await run_demo_mode(agent)
         else:
             await run_interactive_session(agent)
-    finally:
-        # Clean up MCP connection
-        await agent.disconnect_from_mcp_server()
 
 
-if __name__ == "__main__":
+def run():
+    """Run main() on uvloop where available, reporting fatal errors."""
+    # Prefer uvloop's faster event loop where available (not on Windows)
+    try:
+        import uvloop
+        run_loop = uvloop.run
+    except ImportError:
+        run_loop = asyncio.run
+    
     try:
-        asyncio.run(main())
+        run_loop(main())
     except KeyboardInterrupt:
         print("\n👋 Goodbye!")
     except Exception as e:
         print(f"❌ Fatal error: {e}")
+
+
+if __name__ == "__main__":
+    run()
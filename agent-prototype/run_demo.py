@@ -1,15 +1,11 @@
 #!/usr/bin/env python3
 """Quick demo runner script."""
 
-import subprocess
 import sys
 
+from main import run
+
 if __name__ == "__main__":
-    try:
-        subprocess.run([sys.executable, "main.py", "--demo"], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Demo failed with exit code {e.returncode}")
-        sys.exit(e.returncode)
-    except KeyboardInterrupt:
-        print("\nDemo interrupted by user")
-        sys.exit(0)
\ No newline at end of file
+    # Run the demo in-process rather than spawning a fresh interpreter
+    sys.argv = [sys.argv[0], "--demo"]
+    run()
@@ -1,21 +1,22 @@
 """Claude agent implementation with MCP client integration."""
 
-from typing import Dict, Any, List, Optional
-#import asyncio
-import json
+from types import MappingProxyType
+from typing import Callable, Dict, Any, List, Mapping, Optional, Sequence
+import asyncio
+import logging
 import os
-#import subprocess
-from anthropic import Anthropic
+import orjson
+from anthropic import AsyncAnthropic
 from pydantic import BaseModel
 from mcp.client.stdio import stdio_client, StdioServerParameters
 from mcp.client.session import ClientSession
 from contextlib import AsyncExitStack
 
 
-class Message(BaseModel):
-    """Represents a conversation message."""
-    role: str
-    content: str
+logger = logging.getLogger(__name__)
+
+# Marks the end of a prompt prefix that Claude may cache between requests
+CACHE_CONTROL = {"type": "ephemeral"}
 
 
 class AgentConfig(BaseModel):
@@ -24,6 +25,11 @@ class AgentConfig(BaseModel):
     model: str = "claude-3-5-sonnet-20241022"
     max_tokens: int = 4000
     temperature: float = 0.7
+    system_prompt: Optional[str] = None
+    prompt_caching: bool = True
+    max_history_turns: int = 20
+    summarize_over: int = 40
+    summary_model: str = "claude-3-5-haiku-20241022"
     mcp_server_command: List[str] = ["uv", "run", "-m", "src.agent_prototype.mcp_server.server"]
 
 
@@ -32,41 +38,86 @@ class ClaudeAgent:
     
     def __init__(self, config: AgentConfig):
         self.config = config
-        self.client = Anthropic(
+        self.client = AsyncAnthropic(
             api_key=config.api_key or os.getenv("ANTHROPIC_API_KEY")
         )
-        self.conversation_history: List[Message] = []
+        self.conversation_history: List[Dict[str, Any]] = []
         self.mcp_session: Optional[ClientSession] = None
-        self.exit_stack: Optional[AsyncExitStack] = None
+        self._mcp_task: Optional[asyncio.Task] = None
+        self._mcp_stop: Optional[asyncio.Event] = None
+        self._connect_lock = asyncio.Lock()
+        self._tools_cache: Optional[List[Dict[str, Any]]] = None
     
     async def connect_to_mcp_server(self):
         """Connect to the MCP server."""
-        if self.mcp_session is not None:
-            return
-        
-        self.exit_stack = AsyncExitStack()
-        
-        # Start the MCP server process and create client session
-        server_config = StdioServerParameters(
-            command=self.config.mcp_server_command[0],
-            args=self.config.mcp_server_command[1:] if len(self.config.mcp_server_command) > 1 else []
-        )
-        server_params = stdio_client(server_config)
-        read_stream, write_stream = await self.exit_stack.enter_async_context(server_params)
+        # Concurrent callers must not start a second server process
+        async with self._connect_lock:
+            if self.mcp_session is not None:
+                return
+            
+            ready = asyncio.get_running_loop().create_future()
+            self._mcp_stop = asyncio.Event()
+            self._mcp_task = asyncio.create_task(self._run_mcp_session(ready))
+            await ready
+    
+    async def _run_mcp_session(self, ready: asyncio.Future):
+        """Hold the MCP server connection open until disconnect is requested.
         
-        # Create and initialize the client session
-        self.mcp_session = await self.exit_stack.enter_async_context(ClientSession(read_stream, write_stream))
-        await self.mcp_session.initialize()
+        The stdio transport must be entered and exited from the same task, so
+        the connection is owned by this task rather than by whichever caller
+        happened to connect first.
+        """
+        try:
+            async with AsyncExitStack() as exit_stack:
+                # Start the MCP server process and create client session
+                server_config = StdioServerParameters(
+                    command=self.config.mcp_server_command[0],
+                    args=self.config.mcp_server_command[1:] if len(self.config.mcp_server_command) > 1 else [],
+                    # stdio_client only passes a whitelist of variables to the
+                    # server, so forward the server's own settings explicitly
+                    env={"MCP_SIMULATE_LATENCY": os.getenv("MCP_SIMULATE_LATENCY", "")}
+                )
+                server_params = stdio_client(server_config)
+                read_stream, write_stream = await exit_stack.enter_async_context(server_params)
+                
+                # Create and initialize the client session
+                session = await exit_stack.enter_async_context(ClientSession(read_stream, write_stream))
+                await session.initialize()
+                
+                self.mcp_session = session
+                ready.set_result(None)
+                await self._mcp_stop.wait()
+        except Exception as e:
+            if ready.done():
+                raise
+            ready.set_exception(e)
+        finally:
+            self.mcp_session = None
     
     async def disconnect_from_mcp_server(self):
         """Disconnect from the MCP server."""
-        if self.exit_stack:
-            await self.exit_stack.aclose()
-            self.exit_stack = None
-            self.mcp_session = None
+        async with self._connect_lock:
+            try:
+                if self._mcp_task:
+                    task, self._mcp_task = self._mcp_task, None
+                    self._mcp_stop.set()
+                    await task
+            except Exception:
+                # The session already failed (e.g. the server died); don't let
+                # that mask whatever is propagating through __aexit__
+                logger.warning("MCP session ended with an error", exc_info=True)
+            finally:
+                self._tools_cache = None
     
     async def get_available_tools(self) -> List[Dict[str, Any]]:
-        """Get list of available tools from MCP server."""
+        """Get list of available tools from MCP server.
+        
+        The toolset is static for a session, so the result is cached until
+        the agent disconnects from the MCP server.
+        """
+        if self._tools_cache is not None:
+            return self._tools_cache
+        
         if not self.mcp_session:
             await self.connect_to_mcp_server()
         
@@ -81,6 +132,7 @@ class ClaudeAgent:
                 "input_schema": tool.inputSchema
             })
         
+        self._tools_cache = tools
         return tools
     
     def format_tools_for_claude(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -96,10 +148,9 @@ class ClaudeAgent:
             result = await self.mcp_session.call_tool(tool_name, tool_arguments)
             
             # Extract text content from the result
-            text_content = ""
-            for content in result.content:
-                if hasattr(content, 'text'):
-                    text_content += content.text
+            text_content = "".join(
+                content.text for content in result.content if hasattr(content, 'text')
+            )
             
             return {
                 "success": True,
@@ -114,112 +165,215 @@ class ClaudeAgent:
                 "error": str(e)
             }
     
-    async def chat(self, user_message: str) -> str:
-        """Chat with Claude using available tools."""
+    async def create_message(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Any:
+        """Send messages to Claude, streaming text deltas to on_text if given.
+        
+        With prompt caching enabled, the system prompt, tool schemas and the
+        conversation up to the latest turn are marked cacheable so follow-up
+        requests reuse the already processed prefix.
+        """
+        caching = self.config.prompt_caching
+        params: Dict[str, Any] = {
+            "model": self.config.model,
+            "max_tokens": self.config.max_tokens,
+            "temperature": self.config.temperature,
+            "messages": self._add_cache_breakpoint(messages) if caching else messages
+        }
+        if self.config.system_prompt:
+            system_block = {"type": "text", "text": self.config.system_prompt}
+            if caching:
+                system_block["cache_control"] = CACHE_CONTROL
+            params["system"] = [system_block]
+        if tools:
+            if caching:
+                tools = [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+            params["tools"] = tools
+        
+        if on_text is None:
+            return await self.client.messages.create(**params)
+        
+        async with self.client.messages.stream(**params) as stream:
+            async for text in stream.text_stream:
+                on_text(text)
+            return await stream.get_final_message()
+    
+    @staticmethod
+    def _add_cache_breakpoint(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return messages with a cache breakpoint on the last content block."""
+        if not messages:
+            return messages
+        
+        last = messages[-1]
+        content = last["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        if not content or not isinstance(content[-1], dict):
+            return messages
+        
+        content = [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]
+        return [*messages[:-1], {**last, "content": content}]
+    
+    async def chat(self, user_message: str, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Chat with Claude using available tools.
+        
+        If on_text is given, response text is streamed to it as it arrives.
+        """
+        await self._compact_history()
+        
         # Add user message to conversation
-        self.conversation_history.append(Message(role="user", content=user_message))
+        self.conversation_history.append({"role": "user", "content": user_message})
+        
+        # History is already stored in Claude's message format
+        return await self._respond(self.conversation_history, on_text, record=self.conversation_history)
+    
+    async def chat_once(
+        self,
+        user_message: str,
+        history: Optional[Sequence[Dict[str, Any]]] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Answer a single message without touching the conversation history.
         
-        # Get available tools
-        available_tools = await self.get_available_tools()
-        formatted_tools = self.format_tools_for_claude(available_tools)
+        Independent calls can run concurrently. Prior turns may be passed in
+        history to give Claude context.
+        """
+        messages = [*(history or ()), {"role": "user", "content": user_message}]
+        return await self._respond(messages, on_text)
+    
+    async def _compact_history(self):
+        """Summarize older turns once the history exceeds summarize_over.
+        
+        The most recent max_history_turns messages are kept verbatim and
+        everything before them is replaced by a single summary message, so
+        the prompt sent on each turn stops growing without bound.
+        """
+        history = self.conversation_history
+        if len(history) <= self.config.summarize_over:
+            return
+        
+        # Keep recent turns starting at an assistant reply so that roles
+        # still alternate after the summary (which is a user message)
+        split = max(len(history) - self.config.max_history_turns, 0)
+        while split < len(history) and history[split]["role"] != "assistant":
+            split += 1
+        if split == 0:
+            return
+        
+        transcript = "\n\n".join(f"{msg['role']}: {msg['content']}" for msg in history[:split])
+        try:
+            response = await self.client.messages.create(
+                model=self.config.summary_model,
+                max_tokens=1024,
+                messages=[{
+                    "role": "user",
+                    "content": (
+                        "Summarize the following conversation concisely, keeping any "
+                        "facts, decisions and open questions needed to continue it:\n\n"
+                        + transcript
+                    )
+                }]
+            )
+        except Exception:
+            return  # Keep the full history if summarization fails
         
-        # Format conversation history for Claude
-        messages = [
-            {"role": msg.role, "content": msg.content}
-            for msg in self.conversation_history
+        summary = "".join(block.text for block in response.content if block.type == "text")
+        history[:split] = [
+            {"role": "user", "content": f"[Summary of earlier conversation: {summary}]"}
         ]
+    
+    async def _respond(
+        self,
+        messages: List[Dict[str, Any]],
+        on_text: Optional[Callable[[str], None]] = None,
+        record: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """Get Claude's reply to messages, executing any requested tool calls.
+        
+        Assistant replies are appended to record if given.
+        """
+        def add_reply(text: str):
+            if record is not None:
+                record.append({"role": "assistant", "content": text})
+        
+        # Get available tools (MCP tools are already in Claude's format)
+        formatted_tools = await self.get_available_tools()
         
         try:
             # Make initial request to Claude
-            response = self.client.messages.create(
-                model=self.config.model,
-                max_tokens=self.config.max_tokens,
-                temperature=self.config.temperature,
-                messages=messages,
-                tools=formatted_tools if formatted_tools else None
-            )
+            response = await self.create_message(messages, formatted_tools, on_text)
+            
+            # Split the response into text and tool_use blocks in a single pass
+            text_blocks, tool_blocks = [], []
+            for block in response.content:
+                (tool_blocks if block.type == "tool_use" else text_blocks).append(block)
+            response_text = "".join(block.text for block in text_blocks if block.type == "text")
             
             # Handle tool calls if present
-            if response.content and any(block.type == "tool_use" for block in response.content):
+            if tool_blocks:
+                # Execute independent tool calls concurrently
+                results = await asyncio.gather(*(
+                    self.execute_tool_call(block.name, block.input)
+                    for block in tool_blocks
+                ))
+                tool_results = [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": orjson.dumps(tool_result).decode()
+                    }
+                    for block, tool_result in zip(tool_blocks, results)
+                ]
+                
+                # Build the follow-up request without mutating stored history
+                messages = [
+                    *messages,
+                    {"role": "assistant", "content": response.content},
+                    {"role": "user", "content": tool_results}
+                ]
+                
                 # Add Claude's response to conversation
-                assistant_message = ""
-                tool_results = []
+                if response_text:
+                    add_reply(response_text)
                 
-                for block in response.content:
-                    if block.type == "text":
-                        assistant_message += block.text
-                    elif block.type == "tool_use":
-                        # Execute the tool call
-                        tool_result = await self.execute_tool_call(
-                            block.name,
-                            block.input
-                        )
-                        
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": block.id,
-                            "content": json.dumps(tool_result, indent=2)
-                        })
+                # Keep the streamed pre-tool text apart from the final answer
+                if on_text and response_text:
+                    on_text("\n\n")
                 
-                # Add assistant message and tool results to conversation
-                if assistant_message:
-                    self.conversation_history.append(
-                        Message(role="assistant", content=assistant_message)
-                    )
+                # Send tool results back to Claude and get the final response
+                final_response = await self.create_message(messages, formatted_tools, on_text)
                 
-                # Send tool results back to Claude
-                if tool_results:
-                    messages.append({
-                        "role": "assistant", 
-                        "content": response.content
-                    })
-                    messages.append({
-                        "role": "user",
-                        "content": tool_results
-                    })
-                    
-                    # Get final response from Claude
-                    final_response = self.client.messages.create(
-                        model=self.config.model,
-                        max_tokens=self.config.max_tokens,
-                        temperature=self.config.temperature,
-                        messages=messages,
-                        tools=formatted_tools
-                    )
-                    
-                    final_text = ""
-                    for block in final_response.content:
-                        if block.type == "text":
-                            final_text += block.text
-                    
-                    self.conversation_history.append(
-                        Message(role="assistant", content=final_text)
-                    )
-                    
-                    return final_text
+                final_text = "".join(
+                    block.text for block in final_response.content if block.type == "text"
+                )
+                
+                add_reply(final_text)
+                
+                return final_text
             
             # Handle regular text response
-            response_text = ""
-            for block in response.content:
-                if block.type == "text":
-                    response_text += block.text
-            
-            self.conversation_history.append(
-                Message(role="assistant", content=response_text)
-            )
+            add_reply(response_text)
             
             return response_text
             
         except Exception as e:
             error_message = f"Error communicating with Claude: {str(e)}"
-            self.conversation_history.append(
-                Message(role="assistant", content=error_message)
-            )
+            if on_text:
+                on_text(error_message)
+            add_reply(error_message)
             return error_message
     
-    def get_conversation_history(self) -> List[Message]:
-        """Get the current conversation history."""
-        return self.conversation_history.copy()
+    def get_conversation_history(self) -> Sequence[Mapping[str, Any]]:
+        """Get a read-only view of the current conversation history.
+        
+        The tuple is a snapshot of the turns so far and each message is a
+        read-only mapping over the stored entry; copy with dict() to modify.
+        """
+        return tuple(MappingProxyType(msg) for msg in self.conversation_history)
     
     def clear_conversation(self):
         """Clear the conversation history."""
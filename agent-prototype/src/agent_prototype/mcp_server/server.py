@@ -1,12 +1,68 @@
 """MCP Server implementation using FastMCP with integrated tools."""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
 import asyncio
+import copy
+import functools
+import json
+import os
 from fastmcp import FastMCP
 
 # Create the MCP server
 mcp = FastMCP("Agent Prototype Server")
 
+# Placeholder tools only mimic real API latency when this is enabled
+SIMULATE_LATENCY = os.getenv("MCP_SIMULATE_LATENCY", "").lower() in ("1", "true", "yes")
+
+
+async def simulate_latency(seconds: float):
+    """Sleep to simulate an API delay if latency simulation is enabled."""
+    if SIMULATE_LATENCY:
+        await asyncio.sleep(seconds)
+
+
+# Placeholder results are pure functions of their arguments, so while latency
+# is simulated repeated calls are answered from this cache without the delay.
+# Without simulation rebuilding a result is cheaper than a cached copy, so the
+# cache is bypassed entirely. Entries are kept in least-recently-used order.
+_RESULT_CACHE: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+_RESULT_CACHE_SIZE = 512
+
+
+def _cached_result(key: Optional[Tuple]) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached result for key, if any."""
+    if not SIMULATE_LATENCY:
+        return None
+    result = _RESULT_CACHE.get(key)
+    if result is None:
+        return None
+    _RESULT_CACHE.move_to_end(key)
+    return copy.deepcopy(result)
+
+
+def _cache_result(key: Optional[Tuple], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Store a copy of result under key, evicting the least recently used entry when full."""
+    if not SIMULATE_LATENCY:
+        return result
+    if len(_RESULT_CACHE) >= _RESULT_CACHE_SIZE:
+        _RESULT_CACHE.popitem(last=False)
+    _RESULT_CACHE[key] = copy.deepcopy(result)
+    return result
+
+
+@functools.lru_cache(maxsize=512)
+def _build_search_results(query: str, count: int) -> Tuple[Dict[str, str], ...]:
+    """Build the placeholder search results for query once per (query, count)."""
+    return tuple(
+        {
+            "title": f"Result {i+1} for '{query}'",
+            "url": f"https://example.com/result-{i+1}",
+            "snippet": f"This is a placeholder snippet for result {i+1} about {query}."
+        }
+        for i in range(count)
+    )
+
 
 @mcp.tool()
 async def web_search(query: str, max_results: int = 10) -> Dict[str, Any]:
@@ -19,20 +75,27 @@ async def web_search(query: str, max_results: int = 10) -> Dict[str, Any]:
     Returns:
         Search results with titles, URLs, and snippets
     """
-    await asyncio.sleep(0.5)  # Simulate API delay
+    key = ("web_search", query, max_results)
+    cached = _cached_result(key)
+    if cached is not None:
+        return cached
     
-    return {
+    await simulate_latency(0.5)
+    
+    return _cache_result(key, {
         "query": query,
-        "results": [
-            {
-                "title": f"Result {i+1} for '{query}'",
-                "url": f"https://example.com/result-{i+1}",
-                "snippet": f"This is a placeholder snippet for result {i+1} about {query}."
-            }
-            for i in range(min(max_results, 3))
-        ],
+        "results": [dict(result) for result in _build_search_results(query, min(max_results, 3))],
         "total_results": max_results
-    }
+    })
+
+
+# Message templates for each supported file operation
+_FILE_OP_FORMATS = {
+    "read": "Reading file: {path}",
+    "write": "Writing to file: {path} with {length} characters",
+    "delete": "Deleting file: {path}",
+    "list": "Listing directory: {path}"
+}
 
 
 @mcp.tool()
@@ -47,20 +110,19 @@ async def file_operations(operation: str, path: str, content: str = None) -> Dic
     Returns:
         Operation result with status and details
     """
-    await asyncio.sleep(0.2)
+    await simulate_latency(0.2)
     
-    operations = {
-        "read": f"Reading file: {path}",
-        "write": f"Writing to file: {path} with {len(content or '')} characters",
-        "delete": f"Deleting file: {path}",
-        "list": f"Listing directory: {path}"
-    }
+    message_format = _FILE_OP_FORMATS.get(operation)
+    if message_format is None:
+        message = "Unknown operation"
+    else:
+        message = message_format.format(path=path, length=len(content or ''))
     
     return {
         "operation": operation,
         "path": path,
         "status": "success",
-        "message": operations.get(operation, "Unknown operation"),
+        "message": message,
         "content": content if operation == "read" else None
     }
 
@@ -76,11 +138,18 @@ async def code_analysis(code: str, language: str = "python") -> Dict[str, Any]:
     Returns:
         Analysis results including complexity score, issues, and suggestions
     """
-    await asyncio.sleep(1.0)
+    # The result only depends on the line count, so avoid keeping the code itself
+    lines_of_code = code.count('\n') + (1 if code and not code.endswith('\n') else 0)
+    key = ("code_analysis", language, lines_of_code)
+    cached = _cached_result(key)
+    if cached is not None:
+        return cached
     
-    return {
+    await simulate_latency(1.0)
+    
+    return _cache_result(key, {
         "language": language,
-        "lines_of_code": len(code.split('\n')),
+        "lines_of_code": lines_of_code,
         "complexity_score": 7.5,
         "issues": [
             {
@@ -98,7 +167,16 @@ async def code_analysis(code: str, language: str = "python") -> Dict[str, Any]:
             "Consider adding more documentation",
             "This is a placeholder suggestion"
         ]
-    }
+    })
+
+
+# Message templates for each supported data processing operation
+_DATA_OP_FORMATS = {
+    "filter": "Filtered {count} records",
+    "sort": "Sorted {count} records",
+    "aggregate": "Aggregated {count} records",
+    "transform": "Transformed {count} records"
+}
 
 
 @mcp.tool()
@@ -112,23 +190,43 @@ async def data_processing(data: List[Dict[str, Any]], operation: str) -> Dict[st
     Returns:
         Processing results with input/output counts and preview
     """
-    await asyncio.sleep(0.8)
+    # The result only depends on the record count and the previewed records,
+    # so the key stays small however large the payload is
+    key = None
+    if SIMULATE_LATENCY:
+        key = ("data_processing", operation, len(data), json.dumps(data[:2], sort_keys=True, default=str))
+    cached = _cached_result(key)
+    if cached is not None:
+        return cached
     
-    operations = {
-        "filter": f"Filtered {len(data)} records",
-        "sort": f"Sorted {len(data)} records", 
-        "aggregate": f"Aggregated {len(data)} records",
-        "transform": f"Transformed {len(data)} records"
-    }
+    await simulate_latency(0.8)
     
-    return {
+    message_format = _DATA_OP_FORMATS.get(operation)
+    if message_format is None:
+        message = "Unknown operation"
+    else:
+        message = message_format.format(count=len(data))
+    
+    return _cache_result(key, {
         "operation": operation,
         "input_count": len(data),
         "output_count": max(0, len(data) - 1),  # Simulate some processing
         "status": "completed",
-        "message": operations.get(operation, "Unknown operation"),
+        "message": message,
         "preview": data[:2] if data else []
-    }
+    })
+
+
+# system_info() takes no arguments, so its placeholder result is built once
+_SYSTEM_INFO: Dict[str, Any] = {
+    "platform": "placeholder_os",
+    "architecture": "x64",
+    "memory_usage": "45%",
+    "cpu_usage": "23%",
+    "disk_space": "78% used",
+    "uptime": "5 days, 3 hours",
+    "processes": 127
+}
 
 
 @mcp.tool()
@@ -138,17 +236,9 @@ async def system_info() -> Dict[str, Any]:
     Returns:
         System information dictionary with platform details and resource usage
     """
-    await asyncio.sleep(0.3)
+    await simulate_latency(0.3)
     
-    return {
-        "platform": "placeholder_os",
-        "architecture": "x64",
-        "memory_usage": "45%",
-        "cpu_usage": "23%",
-        "disk_space": "78% used",
-        "uptime": "5 days, 3 hours",
-        "processes": 127
-    }
+    return _SYSTEM_INFO.copy()
 
 
 if __name__ == "__main__":
@@ -37,65 +37,35 @@ async def main():
         # Test each tool individually
         print("Testing individual tools...\n")
         
-        # Test system info (no parameters needed)
-        print("1. Testing system_info tool:")
-        try:
-            result = await agent.execute_tool_call("system_info", {})
-            print(f"   Success: {result['success']}")
-            print(f"   Result: {result['result']}")
-        except Exception as e:
-            print(f"   Error: {e}")
-        
-        print()
-        
-        # Test web search
-        print("2. Testing web_search tool:")
-        try:
-            result = await agent.execute_tool_call("web_search", {"query": "MCP framework", "max_results": 3})
-            print(f"   Success: {result['success']}")
-            print(f"   Result: {result['result'][:200]}..." if len(str(result['result'])) > 200 else f"   Result: {result['result']}")
-        except Exception as e:
-            print(f"   Error: {e}")
-        
-        print()
-        
-        # Test file operations
-        print("3. Testing file_operations tool:")
-        try:
-            result = await agent.execute_tool_call("file_operations", {"operation": "list", "path": "."})
-            print(f"   Success: {result['success']}")
-            print(f"   Result: {result['result'][:200]}..." if len(str(result['result'])) > 200 else f"   Result: {result['result']}")
-        except Exception as e:
-            print(f"   Error: {e}")
-        
-        print()
-        
-        # Test code analysis
-        print("4. Testing code_analysis tool:")
         test_code = '''
 def factorial(n):
     if n == 0 or n == 1:
         return 1
     return n * factorial(n-1)
 '''
-        try:
-            result = await agent.execute_tool_call("code_analysis", {"code": test_code, "language": "python"})
-            print(f"   Success: {result['success']}")
-            print(f"   Result: {result['result'][:200]}..." if len(str(result['result'])) > 200 else f"   Result: {result['result']}")
-        except Exception as e:
-            print(f"   Error: {e}")
+        # (tool name, arguments, truncate long results)
+        cases = [
+            ("system_info", {}, False),
+            ("web_search", {"query": "MCP framework", "max_results": 3}, True),
+            ("file_operations", {"operation": "list", "path": "."}, True),
+            ("code_analysis", {"code": test_code, "language": "python"}, True),
+            ("data_processing", {"data": [1, 2, 3, 4, 5], "operation": "sum"}, False),
+        ]
         
-        print()
+        # The tool calls are independent, so run them concurrently
+        results = await asyncio.gather(
+            *(agent.execute_tool_call(name, args) for name, args, _ in cases),
+            return_exceptions=True
+        )
         
-        # Test data processing
-        print("5. Testing data_processing tool:")
-        try:
-            test_data = [1, 2, 3, 4, 5]
-            result = await agent.execute_tool_call("data_processing", {"data": test_data, "operation": "sum"})
-            print(f"   Success: {result['success']}")
-            print(f"   Result: {result['result']}")
-        except Exception as e:
-            print(f"   Error: {e}")
+        for i, ((name, _, truncate), result) in enumerate(zip(cases, results), 1):
+            print(f"{i}. Testing {name} tool:")
+            if isinstance(result, Exception):
+                print(f"   Error: {result}")
+            else:
+                print(f"   Success: {result['success']}")
+                print(f"   Result: {result['result'][:200]}..." if truncate and len(str(result['result'])) > 200 else f"   Result: {result['result']}")
+            print()
         
         print("\n" + "="*50)
         print("MCP communication test completed successfully!")